@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+""" Lines/second of the asyncio recipes against the synchronous versions
+
+Each stream is an OS pipe fed in small chunks by its own writer thread,
+standing in for a socket or subprocess pipe. Every stream runs
+strip -> dedupe -> search -> combine over the same bytes in two ways:
+    sync : the plain generators, one reader thread per stream
+    async: cookbook.aio.pipeline() with bounded buffers, all streams on one event loop
+The results of the two are compared before any timings are reported.
+
+Usage: python benchmarks/aio_throughput.py [--streams 200] [--lines 2000] [--maxsize 64] [--executor]
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cookbook import aio
+from cookbook import combine, dedupe, search
+
+WORDS = ('python', 'spam', 'eggs', 'ham', 'cookbook', 'deque', 'heapq', 'generator')
+
+def make_payload(nlines, seed):
+    rng = random.Random(seed)
+    return ''.join(' {} {} {}\t\n'.format(*rng.sample(WORDS, 3)) for _ in range(nlines)).encode('utf-8')
+
+def open_streams(payloads, chunk=4096):
+    '''Return a read fd per payload; a writer thread per pipe writes the payload in chunks.'''
+    def write(fd, payload):
+        with os.fdopen(fd, 'wb', buffering=0) as f:
+            for i in range(0, len(payload), chunk):
+                f.write(payload[i:i + chunk])
+    fds = []
+    for payload in payloads:
+        r, w = os.pipe()
+        threading.Thread(target=write, args=(w, payload), daemon=True).start()
+        fds.append(r)
+    return fds
+
+def sync_stream(fd):
+    with os.fdopen(fd, 'rb') as f:
+        lines = (line.decode('utf-8').strip() for line in f)
+        matches = (line + '|' + ','.join(prev) for line, prev in search(dedupe(lines), 'python', 3))
+        return list(combine(matches, 256))
+
+def run_sync(payloads):
+    fds = open_streams(payloads)
+    with ThreadPoolExecutor(max_workers=len(fds)) as pool:
+        return list(pool.map(sync_stream, fds))
+
+async def format_matches(items):
+    async for line, prev in items:
+        yield line + '|' + ','.join(prev)
+
+async def async_stream(fd, maxsize, executor):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', buffering=0))
+    try:
+        return [part async for part in aio.pipeline(
+            aio.lines(reader),
+            partial(aio.strip_lines, executor=executor),
+            aio.dedupe,
+            partial(aio.search, pattern='python', history=3),
+            format_matches,
+            partial(aio.combine, maxsize=256),
+            maxsize=maxsize)]
+    finally:
+        transport.close()
+
+async def run_async(payloads, maxsize, executor):
+    fds = open_streams(payloads)
+    return await asyncio.gather(*(async_stream(fd, maxsize, executor) for fd in fds))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--streams', type=int, default=200)
+    parser.add_argument('--lines', type=int, default=2000)
+    parser.add_argument('--maxsize', type=int, default=64)
+    parser.add_argument('--executor', action='store_true', help='offload the strip stage to a thread pool')
+    args = parser.parse_args(argv)
+
+    payloads = [make_payload(args.lines, seed) for seed in range(args.streams)]
+    total = args.streams * args.lines
+
+    start = time.perf_counter()
+    expected = run_sync(payloads)
+    sync_elapsed = time.perf_counter() - start
+
+    executor = ThreadPoolExecutor() if args.executor else None
+    start = time.perf_counter()
+    actual = asyncio.run(run_async(payloads, args.maxsize, executor))
+    async_elapsed = time.perf_counter() - start
+    if executor is not None:
+        executor.shutdown()
+
+    if actual != expected:
+        print('FAIL: async pipeline output differs from the synchronous recipes')
+        return 1
+    print('{} streams x {} lines'.format(args.streams, args.lines))
+    print('sync : {:>12,.0f} lines/s (thread per stream)'.format(total / sync_elapsed))
+    print('async: {:>12,.0f} lines/s (one event loop, maxsize={}, executor={})'.format(
+        total / async_elapsed, args.maxsize, args.executor))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
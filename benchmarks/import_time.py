@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+""" Cold-import time budget for the cookbook package
+
+Runs `python -X importtime -c "import cookbook"` in fresh interpreters and fails
+(exit status 1) if the cumulative import time of the package exceeds the budget,
+or if importing it drags in modules that should only be loaded on first use.
+
+Usage: python benchmarks/import_time.py [--budget-ms 5.0] [--runs 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Modules that must not be imported by a bare `import cookbook`
+DEFERRED = ('cookbook.data_structures', 'cookbook.text', 'cookbook.instrument', 'cookbook.aio',
+            'unicodedata', 'asyncio')
+
+def import_times(module='cookbook'):
+    '''Return {module name: cumulative microseconds} from one fresh `-X importtime` run.'''
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        #Lines look like: "import time:       123 |        456 |   cookbook"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    samples = []
+    for _ in range(args.runs):
+        times = import_times()
+        loaded = [name for name in DEFERRED if name in times]
+        if loaded:
+            print('FAIL: import cookbook eagerly loaded', ', '.join(loaded))
+            return 1
+        samples.append(times['cookbook'] / 1000)
+
+    best = min(samples)
+    print('import cookbook: best {:.2f} ms, worst {:.2f} ms over {} runs (budget {:.2f} ms)'.format(
+        best, max(samples), args.runs, args.budget_ms))
+    #Best-of-N filters out noise from a busy machine
+    if best > args.budget_ms:
+        print('FAIL: over budget')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+""" Importable helpers from the Python Cookbook recipes
+
+Nothing is imported or computed until a name is first looked up (PEP 562),
+so `import cookbook` stays cheap in short-lived worker processes.
+"""
+
+#Public name -> submodule that defines it
+_exports = {
+    'search': 'data_structures',        #1.3
+    'PriorityQueue': 'data_structures', #1.5
+    'dedupe': 'data_structures',        #1.10
+    'matchcase': 'text',                #2.6
+    'clean_spaces': 'text',             #2.12
+    'combining_chars': 'text',          #2.12
+    'digit_map': 'text',                #2.12
+    'remove_accents': 'text',           #2.12
+    'combine': 'text',                  #2.14
+    'safesub': 'text',                  #2.15
+}
+
+__all__ = sorted(_exports)
+
+def __getattr__(name):
+    try:
+        module = _exports[name]
+    except KeyError:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name)) from None
+    import importlib #Not imported at module level; it pulls in warnings
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value #Cache so __getattr__ is only hit once per name
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+""" asyncio streaming versions of the line-processing recipes
+
+Async-generator counterparts of search (1.3), dedupe (1.10), the
+(line.strip() for line in f) transform (2.11) and combine (2.14). Every
+function accepts an async iterable (an asyncio.StreamReader, another stage)
+or a plain iterable, so stages can be chained directly or through pipeline(),
+which puts a bounded asyncio.Queue between stages for backpressure.
+
+CPU-heavy per-item work (regex matching, normalization) can be moved off the
+event loop by passing a concurrent.futures executor; items are then handed to
+the executor in chunks of up to `chunksize` to amortize the hand-off cost. A
+partial chunk is sent whenever no more input is ready.
+
+Example:
+    reader, writer = await asyncio.open_connection(host, port)
+    async for line, prev in pipeline(lines(reader), strip_lines, dedupe,
+                                     partial(search, pattern='python'), maxsize=128):
+        ...
+"""
+
+import asyncio
+from collections import deque
+from functools import partial
+from itertools import islice
+
+class _Done:
+    '''End-of-stream marker put on a buffer queue, carrying the producer's exception if any.'''
+    __slots__ = ('error',)
+    def __init__(self, error=None):
+        self.error = error
+
+def _aiter(items):
+    '''Return an async iterator over items, wrapping plain iterables.'''
+    if hasattr(items, '__aiter__'):
+        return items.__aiter__()
+    return _from_iterable(items)
+
+async def _from_iterable(items):
+    for item in items:
+        yield item
+
+async def _aclose(items):
+    aclose = getattr(items, 'aclose', None)
+    if aclose is not None:
+        await aclose()
+
+async def lines(reader, encoding='utf-8', errors='strict'):
+    '''Yield decoded lines from an asyncio.StreamReader (socket or subprocess pipe).'''
+    async for line in reader:
+        yield line.decode(encoding, errors)
+
+class _Buffer:
+    '''Async iterator that runs items in its own task behind a bounded queue (see buffered()).'''
+    def __init__(self, items, maxsize):
+        self._items = items
+        self._queue = asyncio.Queue(maxsize)
+        self._task = None
+        self._end = None
+
+    async def _produce(self):
+        it = _aiter(self._items)
+        try:
+            async for item in it:
+                await self._queue.put(item)
+        except Exception as e:
+            await self._queue.put(_Done(e))
+        else:
+            await self._queue.put(_Done())
+        finally:
+            await _aclose(it)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._end is None:
+            if self._task is None:
+                self._task = asyncio.ensure_future(self._produce())
+            try:
+                item = await self._queue.get()
+            except asyncio.CancelledError:
+                self._task.cancel()
+                raise
+            if type(item) is not _Done:
+                return item
+            self._end = item
+        return self._finish()
+
+    def _finish(self):
+        error, self._end = self._end.error, _Done()
+        if error is not None:
+            raise error
+        raise StopAsyncIteration
+
+    def drain(self, limit):
+        '''Return up to limit items that are already buffered, without waiting.'''
+        items = []
+        while self._end is None and len(items) < limit:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if type(item) is _Done:
+                self._end = item #Raised by the next __anext__, after these items are used
+            else:
+                items.append(item)
+        return items
+
+    async def aclose(self):
+        if self._end is None:
+            self._end = _Done()
+        if self._task is not None:
+            self._task.cancel()
+            #Wait for the producer to unwind so its stage is closed; wait() never raises its result
+            await asyncio.wait((self._task,))
+
+def buffered(items, maxsize=64):
+    '''Run items in its own task, buffering at most maxsize results.
+
+    When the buffer is full the producer waits, so a slow consumer throttles
+    the upstream stage instead of letting memory grow without bound. Call
+    aclose() (pipeline() does) to stop the producer task early.
+    '''
+    return _Buffer(items, maxsize)
+
+async def pipeline(source, *stages, maxsize=64):
+    '''Chain stages (callables taking and returning an async iterable) with bounded buffers between them.
+
+    Use functools.partial to bind extra arguments, e.g. partial(search, pattern='python').
+    Closing or cancelling the pipeline closes every stage and buffer task, downstream first.
+    '''
+    buffers = []
+    items = source
+    for stage in stages:
+        buffers.append(buffered(items, maxsize))
+        items = stage(buffers[-1])
+    items = _aiter(items)
+    try:
+        async for item in items:
+            yield item
+    finally:
+        await _aclose(items)
+        for buffer in reversed(buffers):
+            await buffer.aclose()
+
+async def _chunks(items, chunksize):
+    '''Group items into lists of up to chunksize.
+
+    A chunk is sent as soon as upstream has nothing more ready, so a quiet
+    stream never holds back lines waiting for a full chunk. Async sources are
+    read through a buffer so ready items can be drained without a task per item.
+    '''
+    if not hasattr(items, '__aiter__'):
+        it = iter(items)
+        chunk = list(islice(it, chunksize))
+        while chunk:
+            yield chunk
+            chunk = list(islice(it, chunksize))
+        return
+    buffer = items if isinstance(items, _Buffer) else _Buffer(items, chunksize)
+    try:
+        async for item in buffer:
+            yield [item] + buffer.drain(chunksize - 1)
+    finally:
+        if buffer is not items:
+            await buffer.aclose()
+
+async def amap(func, items, executor=None, chunksize=64):
+    '''Async (func(x) for x in items); with an executor, func runs off the event loop.'''
+    if executor is None:
+        async for item in _aiter(items):
+            yield func(item)
+        return
+    loop = asyncio.get_running_loop()
+    chunks = _chunks(items, chunksize)
+    try:
+        async for chunk in chunks:
+            for result in await loop.run_in_executor(executor, _map_list, func, chunk):
+                yield result
+    finally:
+        await chunks.aclose()
+
+def _map_list(func, chunk):
+    return [func(item) for item in chunk]
+
+def _test_list(pred, chunk):
+    #bool() so regex Match objects never have to cross a process boundary
+    return [bool(pred(item)) for item in chunk]
+
+#1.3 - Keeping the Last N Items
+async def search(lines, pattern, history=5, executor=None, chunksize=64):
+    '''Async version of search(); pattern may be a substring or a compiled regex.
+
+    Yields a tuple copy of the previous lines rather than the live deque, since
+    a buffered consumer may only see the match after more lines have arrived.
+    With an executor, the matching is done off the event loop in chunks.
+    '''
+    match = pattern.search if hasattr(pattern, 'search') else partial(_contains, pattern)
+    previous_lines = deque(maxlen=history)
+    if executor is None:
+        async for line in _aiter(lines):
+            if match(line):
+                yield line, tuple(previous_lines)
+            previous_lines.append(line)
+        return
+    loop = asyncio.get_running_loop()
+    chunks = _chunks(lines, chunksize)
+    try:
+        async for chunk in chunks:
+            hits = await loop.run_in_executor(executor, _test_list, match, chunk)
+            for line, hit in zip(chunk, hits):
+                if hit:
+                    yield line, tuple(previous_lines)
+                previous_lines.append(line)
+    finally:
+        await chunks.aclose()
+
+#Module-level helpers rather than lambdas so they can be sent to a ProcessPoolExecutor
+def _contains(pattern, line):
+    return pattern in line
+
+#1.10 - Removing Duplicates from a Sequence while Maintaining Order
+async def dedupe(items, key=None):
+    '''Async version of dedupe().'''
+    seen = set()
+    async for item in _aiter(items):
+        val = item if key is None else key(item)
+        if val not in seen:
+            yield item
+            seen.add(val)
+
+#2.11 - Stripping Unwanted Characters from Strings
+def strip_lines(lines, chars=None, executor=None, chunksize=64):
+    '''Async (line.strip(chars) for line in lines).'''
+    return amap(partial(_strip, chars=chars), lines, executor, chunksize)
+
+def _strip(line, chars=None):
+    return line.strip(chars)
+
+#2.14 - Combining and Concatenating Strings
+async def combine(source, maxsize):
+    '''Async version of combine().'''
+    parts = []
+    size = 0
+    async for part in _aiter(source):
+        parts.append(part)
+        size += len(part)
+        if size > maxsize:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
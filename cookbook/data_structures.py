@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+""" Chapter 1: Data Structures and Algorithms - importable helpers """
+
+from collections import deque
+import heapq
+
+#1.3 - Keeping the Last N Items
+def search(lines, pattern, history=5):
+    '''Yield (line, previous_lines) for every line containing pattern.
+
+    previous_lines is a deque holding up to `history` lines seen before the match.
+    '''
+    previous_lines = deque(maxlen=history)
+    for line in lines:
+        if pattern in line:
+            yield line, previous_lines
+        previous_lines.append(line)
+
+#1.5 - Implementing a Priority Queue
+class PriorityQueue:
+    '''Queue that always pops the item with the highest priority (FIFO among equal priorities).'''
+    def __init__(self):
+        self._queue = []
+        self._index = 0
+
+    def push(self, item, priority):
+        heapq.heappush(self._queue, (-priority, self._index, item))
+        self._index += 1
+
+    def pop(self):
+        return heapq.heappop(self._queue)[-1]
+
+    def __len__(self):
+        return len(self._queue)
+
+#1.10 - Removing Duplicates from a Sequence while Maintaining Order
+def dedupe(items, key=None):
+    '''Yield items in order, skipping duplicates.
+
+    key converts unhashable items (dicts, etc.) into a hashable value used for duplicate detection.
+    '''
+    seen = set()
+    for item in items:
+        val = item if key is None else key(item)
+        if val not in seen:
+            yield item
+            seen.add(val)
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+""" Opt-in instrumentation for the generator pipelines
+
+Wraps a pipeline stage and records, per stage name:
+    - items pulled from upstream and items yielded downstream
+    - time spent producing each output item (excluding time blocked upstream)
+    - time blocked waiting on the upstream iterator
+    - memory held by the stage (len() and sys.getsizeof() of a named local)
+
+Nothing is recorded until enable() is called. While disabled, an instrumented
+stage returns the plain, unwrapped generator, so the per-item cost is zero.
+
+Example:
+    from cookbook import dedupe, search
+    from cookbook import instrument
+
+    instrument.enable()
+    dedupe = instrument.stage(dedupe, 'dedupe', held='seen')
+    search = instrument.stage(search, 'search', held='previous_lines')
+    lines = instrument.map_stage('strip', str.strip, f)       #2.11
+    for line, prev in search(dedupe(lines), 'python'):
+        ...
+    instrument.registry.snapshot()
+    instrument.registry.write_prometheus('pipeline.prom')
+"""
+
+from bisect import bisect_left
+from functools import wraps
+import sys
+import time
+import warnings
+
+#Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+_enabled = False
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+class Histogram:
+    '''Cumulative-bucket latency histogram in the Prometheus style.'''
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        '''Return [(upper bound, count of observations <= bound), ...] ending with +Inf.'''
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def snapshot(self):
+        return {'buckets': self.cumulative(), 'sum': self.sum, 'count': self.count}
+
+class StageStats:
+    '''Counters, histograms and memory gauges for one named stage.'''
+    def __init__(self, name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.item_seconds = Histogram(buckets)
+        self.wait_seconds = Histogram(buckets)
+        self.held_items = 0
+        self.held_bytes = 0
+        self.max_held_items = 0
+
+    def record_held(self, obj):
+        n = len(obj)
+        self.held_items = n
+        self.held_bytes = sys.getsizeof(obj)
+        if n > self.max_held_items:
+            self.max_held_items = n
+
+    def snapshot(self):
+        return {
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'item_seconds': self.item_seconds.snapshot(),
+            'wait_seconds': self.wait_seconds.snapshot(),
+            'held_items': self.held_items,
+            'held_bytes': self.held_bytes,
+            'max_held_items': self.max_held_items,
+        }
+
+class Registry:
+    '''Collection of StageStats keyed by stage name.'''
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.stages = {}
+
+    def stats(self, name):
+        try:
+            return self.stages[name]
+        except KeyError:
+            stats = self.stages[name] = StageStats(name, self.buckets)
+            return stats
+
+    def reset(self):
+        self.stages.clear()
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stages.items()}
+
+    def to_prometheus(self, prefix='cookbook_stage'):
+        '''Render every stage in the Prometheus text exposition format.'''
+        lines = []
+        def metric(name, kind, help, values):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help))
+            lines.append('# TYPE {}_{} {}'.format(prefix, name, kind))
+            for stage, value in values:
+                lines.append('{}_{}{{stage="{}"}} {}'.format(prefix, name, _escape(stage), _number(value)))
+        def histogram(name, help, attr):
+            lines.append('# HELP {}_{} {}'.format(prefix, name, help))
+            lines.append('# TYPE {}_{} histogram'.format(prefix, name))
+            for stage, stats in self.stages.items():
+                hist = getattr(stats, attr)
+                label = _escape(stage)
+                for bound, count in hist.cumulative():
+                    lines.append('{}_{}_bucket{{stage="{}",le="{}"}} {}'.format(
+                        prefix, name, label, _number(bound), count))
+                lines.append('{}_{}_sum{{stage="{}"}} {}'.format(prefix, name, label, _number(hist.sum)))
+                lines.append('{}_{}_count{{stage="{}"}} {}'.format(prefix, name, label, hist.count))
+
+        stages = self.stages.items()
+        metric('items_in_total', 'counter', 'Items pulled from the upstream iterator.',
+               ((name, s.items_in) for name, s in stages))
+        metric('items_out_total', 'counter', 'Items yielded downstream.',
+               ((name, s.items_out) for name, s in stages))
+        histogram('item_seconds', 'Time spent producing each output item, excluding upstream waits.', 'item_seconds')
+        histogram('wait_seconds', 'Time blocked waiting on the upstream iterator per item.', 'wait_seconds')
+        metric('held_items', 'gauge', 'Items held in the stage buffer (e.g. the dedupe seen set).',
+               ((name, s.held_items) for name, s in stages))
+        metric('held_bytes', 'gauge', 'sys.getsizeof() of the stage buffer.',
+               ((name, s.held_bytes) for name, s in stages))
+        metric('max_held_items', 'gauge', 'Largest number of items held in the stage buffer so far.',
+               ((name, s.max_held_items) for name, s in stages))
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='cookbook_stage'):
+        '''Write to_prometheus() output to path (e.g. for the node_exporter textfile collector).'''
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus(prefix))
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+registry = Registry()
+
+def _timed_upstream(items, stats, clock, waited):
+    '''Yield from items, recording the time blocked on each next() into stats and waited[0].'''
+    it = iter(items)
+    while True:
+        start = clock()
+        try:
+            item = next(it)
+        except StopIteration:
+            waited[0] += clock() - start
+            return
+        elapsed = clock() - start
+        waited[0] += elapsed
+        stats.wait_seconds.observe(elapsed)
+        stats.items_in += 1
+        yield item
+
+def _find_held(gen, held, name):
+    '''Look up the held buffer once, after the stage's first yield; warn and return None if it is missing.'''
+    frame = getattr(gen, 'gi_frame', None)
+    buffer = None if frame is None else frame.f_locals.get(held)
+    if buffer is None:
+        warnings.warn('stage {!r} has no local {!r} to report as held memory'.format(name, held),
+                      RuntimeWarning, stacklevel=3)
+    return buffer
+
+def _run(gen, stats, clock, waited, held):
+    it = iter(gen)
+    #The buffer object (set/deque) is created once and mutated, so it is looked up only once
+    buffer = None
+    try:
+        while True:
+            waited[0] = 0.0
+            start = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                #The stage may still add to its buffer after its last yield (e.g. dedupe's seen.add)
+                if buffer is not None:
+                    stats.record_held(buffer)
+                return
+            stats.item_seconds.observe(clock() - start - waited[0])
+            stats.items_out += 1
+            if held is not None:
+                buffer = _find_held(gen, held, stats.name)
+                held = None
+            if buffer is not None:
+                stats.record_held(buffer)
+            yield item
+    finally:
+        if hasattr(gen, 'close'):
+            gen.close()
+
+def stage(func, name=None, held=None, registry=registry):
+    '''Wrap a generator function whose first argument is the upstream iterable.
+
+    held names a local variable of func (e.g. 'seen' in dedupe) whose size is
+    reported as the memory held by the stage; it is looked up once, after the
+    first item, and a RuntimeWarning is issued if it does not exist. func may
+    also return any other iterable (e.g. sorted), which has no held buffer.
+    '''
+    name = name or getattr(func, '__name__', repr(func))
+    @wraps(func)
+    def wrapper(items, *args, **kwargs):
+        if not _enabled:
+            return func(items, *args, **kwargs)
+        stats = registry.stats(name)
+        clock = time.perf_counter
+        waited = [0.0]
+        gen = func(_timed_upstream(items, stats, clock, waited), *args, **kwargs)
+        return _run(gen, stats, clock, waited, held)
+    return wrapper
+
+def _map(items, func):
+    for item in items:
+        yield func(item)
+
+def _filter(items, pred):
+    for item in items:
+        if pred(item):
+            yield item
+
+def map_stage(name, func, items, registry=registry):
+    '''Instrumented equivalent of (func(x) for x in items), e.g. the 2.11 line.strip() transform.'''
+    if not _enabled:
+        return map(func, items)
+    return stage(_map, name, registry=registry)(items, func)
+
+def filter_stage(name, pred, items, registry=registry):
+    '''Instrumented equivalent of (x for x in items if pred(x)), e.g. the 1.16/1.19 filters.'''
+    if not _enabled:
+        return filter(pred, items)
+    return stage(_filter, name, registry=registry)(items, pred)
+
+def watch(items, name, registry=registry):
+    '''Instrument an existing iterable (e.g. a generator expression) without wrapping its source.
+
+    Upstream waits cannot be separated here, so all time is counted as item time
+    and every item is counted both in and out.
+    '''
+    if not _enabled:
+        return items
+    return _watch(items, registry.stats(name), time.perf_counter)
+
+def _watch(items, stats, clock):
+    it = iter(items)
+    while True:
+        start = clock()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        stats.item_seconds.observe(clock() - start)
+        stats.items_in += 1
+        stats.items_out += 1
+        yield item
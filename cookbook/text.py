@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+""" Chapter 2: Strings and Text - importable helpers
+
+The Unicode translation tables from 2.12 scan all of sys.maxunicode, so they are
+built on first use and cached rather than at import time.
+"""
+
+from functools import lru_cache
+
+#2.6 - Searching and Replacing Case-Insensitive Text
+def matchcase(word):
+    '''Return a re.sub() replacement function that gives `word` the case of the matched text.'''
+    def replace(m):
+        text = m.group()
+        if text.isupper():
+            return word.upper()
+        elif text.islower():
+            return word.lower()
+        elif text[0].isupper():
+            return word.capitalize()
+        else:
+            return word
+    return replace
+
+#2.12 - Sanitizing and Cleaning Up Text
+def clean_spaces(s):
+    '''Drop carriage returns and turn tabs/form feeds into spaces.'''
+    s = s.replace('\r', '')
+    s = s.replace('\t', ' ')
+    s = s.replace('\f', ' ')
+    return s
+
+@lru_cache(maxsize=None)
+def combining_chars():
+    '''Translation table mapping every Unicode combining character to None (built once).'''
+    import sys
+    import unicodedata
+    return dict.fromkeys(c for c in range(sys.maxunicode)
+                         if unicodedata.combining(chr(c)))
+
+@lru_cache(maxsize=None)
+def digit_map():
+    '''Translation table mapping every Unicode decimal digit to its ASCII equivalent (built once).'''
+    import sys
+    import unicodedata
+    return { c: ord('0') + unicodedata.digit(chr(c))
+             for c in range(sys.maxunicode)
+             if unicodedata.category(chr(c)) == 'Nd' }
+
+def remove_accents(s):
+    '''Strip diacritical marks by decomposing to NFD and deleting combining characters.'''
+    import unicodedata
+    return unicodedata.normalize('NFD', s).translate(combining_chars())
+
+#2.14 - Combining and Concatenating Strings
+def combine(source, maxsize):
+    '''Join string fragments from source into chunks of roughly maxsize characters.'''
+    parts = []
+    size = 0
+    for part in source:
+        parts.append(part)
+        size += len(part)
+        if size > maxsize:
+            yield ''.join(parts)
+            parts = []
+            size = 0
+    if parts:
+        yield ''.join(parts)
+
+#2.15 - Interpolating Variables in Strings
+class safesub(dict):
+    '''dict for str.format_map() that leaves missing keys as '{key}' instead of raising KeyError.'''
+    def __missing__(self, key):
+        return '{' + key + '}'
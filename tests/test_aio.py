@@ -0,0 +1,230 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import re
+
+import pytest
+
+from cookbook import aio
+from cookbook.data_structures import dedupe, search
+from cookbook.text import combine
+
+LINES = ['  a python\n', 'b\t\n', '  a python\n', 'c python \n', 'pythonic d\n'] * 20
+
+def run(coro):
+    return asyncio.run(coro)
+
+def stream(lines, eof=True):
+    '''StreamReader stand-in for a socket or subprocess pipe, pre-fed with lines.'''
+    reader = asyncio.StreamReader()
+    reader.feed_data(''.join(lines).encode('utf-8'))
+    if eof:
+        reader.feed_eof()
+    return reader
+
+async def collect(items):
+    return [item async for item in items]
+
+async def settle(turns=10):
+    for _ in range(turns):
+        await asyncio.sleep(0)
+
+def other_tasks():
+    return [t for t in asyncio.all_tasks() if t is not asyncio.current_task() and not t.done()]
+
+def test_lines_decodes_stream_reader():
+    async def main():
+        return await collect(aio.lines(stream(['a\n', 'é\n'])))
+    assert run(main()) == ['a\n', 'é\n']
+
+def test_pipeline_matches_sync_recipes():
+    expected_lines = [(line, tuple(prev)) for line, prev in
+                      search(dedupe(line.strip() for line in LINES), 'python', 2)]
+    expected_chunks = list(combine((line.strip() for line in LINES), 40))
+
+    async def main():
+        found = await collect(aio.pipeline(
+            aio.lines(stream(LINES)), aio.strip_lines, aio.dedupe,
+            partial(aio.search, pattern='python', history=2), maxsize=1))
+        chunks = await collect(aio.pipeline(
+            aio.lines(stream(LINES)), aio.strip_lines, partial(aio.combine, maxsize=40), maxsize=3))
+        return found, chunks
+    found, chunks = run(main())
+    assert found == expected_lines
+    assert chunks == expected_chunks
+
+def test_plain_iterables_are_accepted():
+    async def main():
+        return await collect(aio.dedupe([3, 1, 3, 2, 1]))
+    assert run(main()) == [3, 1, 2]
+
+def test_bounded_buffers_limit_producer_run_ahead():
+    produced = []
+    async def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    async def main():
+        maxsize = 4
+        items = aio.pipeline(source(), aio.dedupe, aio.dedupe, maxsize=maxsize)
+        first = await items.__anext__()
+        await settle(50)
+        #Two queues of maxsize, plus one item in flight at each stage boundary
+        assert len(produced) <= 1 + 2 * maxsize + 3
+        rest = await collect(items)
+        return [first] + rest
+    assert run(main()) == list(range(1000))
+
+def test_producer_exception_reaches_consumer():
+    async def broken():
+        yield 'a python'
+        raise ValueError('boom')
+
+    async def main():
+        got = []
+        with pytest.raises(ValueError, match='boom'):
+            async for line, prev in aio.pipeline(broken(), aio.dedupe,
+                                                 partial(aio.search, pattern='python'), maxsize=1):
+                got.append(line)
+        await settle()
+        assert other_tasks() == []
+        return got
+    assert run(main()) == ['a python']
+
+def test_aclose_cancels_buffer_tasks():
+    async def main():
+        items = aio.pipeline(range(10 ** 6), aio.dedupe, aio.dedupe, maxsize=2)
+        async for i in items:
+            if i == 3:
+                break
+        await items.aclose()
+        del items
+        await settle()
+        assert other_tasks() == []
+    run(main())
+
+def test_cancelling_consumer_cleans_up():
+    async def main():
+        reader = stream(['x\n'], eof=False) #Never finishes, like an idle socket
+        async def consume():
+            return await collect(aio.pipeline(aio.lines(reader), aio.strip_lines, aio.dedupe, maxsize=2))
+        task = asyncio.ensure_future(consume())
+        await settle()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await settle()
+        assert other_tasks() == []
+    run(main())
+
+def test_thread_executor_strip():
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            return await collect(aio.strip_lines(aio.lines(stream(LINES)), executor=executor, chunksize=7))
+    assert run(main()) == [line.strip() for line in LINES]
+
+def test_process_executor_regex_search():
+    pattern = re.compile(r'python\w')
+    expected = []
+    previous = []
+    for line in LINES:
+        if pattern.search(line):
+            expected.append((line, tuple(previous[-3:])))
+        previous.append(line)
+
+    async def main():
+        with ProcessPoolExecutor(2) as executor:
+            return await collect(aio.search(aio.lines(stream(LINES)), pattern, history=3,
+                                            executor=executor, chunksize=8))
+    assert run(main()) == expected
+
+def test_executor_does_not_wait_for_full_chunk():
+    async def main():
+        reader = stream(['hello\n'], eof=False)
+        with ThreadPoolExecutor(1) as executor:
+            items = aio.strip_lines(aio.lines(reader), executor=executor, chunksize=64)
+            first = await asyncio.wait_for(items.__anext__(), 1)
+            reader.feed_data(b' more \n')
+            reader.feed_eof()
+            rest = await collect(items)
+        return [first] + rest
+    assert run(main()) == ['hello', 'more']
+
+async def slow_source(n=1000):
+    for i in range(n):
+        await asyncio.sleep(0)
+        yield ' {} '.format(i)
+
+def test_aclose_with_executor_stage():
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            items = aio.pipeline(slow_source(), partial(aio.strip_lines, executor=executor),
+                                 aio.dedupe, maxsize=2)
+            assert await items.__anext__() == '0'
+            await items.aclose()
+            await settle()
+            assert other_tasks() == []
+    run(main())
+
+def test_aclose_standalone_executor_stage():
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            items = aio.search(slow_source(), '1', executor=executor, chunksize=4)
+            line, prev = await items.__anext__()
+            assert line == ' 1 '
+            await items.aclose()
+            await settle()
+            assert other_tasks() == []
+    run(main())
+
+def test_cancelling_executor_pipeline_cleans_up():
+    async def main():
+        reader = stream(['x\n'], eof=False)
+        with ThreadPoolExecutor(2) as executor:
+            async def consume():
+                return await collect(aio.pipeline(
+                    aio.lines(reader), partial(aio.strip_lines, executor=executor), aio.dedupe, maxsize=2))
+            task = asyncio.ensure_future(consume())
+            await settle()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await settle()
+            assert other_tasks() == []
+    run(main())
+
+def test_executor_chunks_drain_ready_items(monkeypatch):
+    sizes = []
+    def map_list(func, chunk):
+        sizes.append(len(chunk))
+        return [func(item) for item in chunk]
+    monkeypatch.setattr(aio, '_map_list', map_list)
+
+    async def source():
+        for i in range(100):
+            yield ' {} '.format(i)
+
+    async def main():
+        with ThreadPoolExecutor(1) as executor:
+            return await collect(aio.pipeline(
+                source(), partial(aio.strip_lines, executor=executor, chunksize=16), maxsize=64))
+    assert run(main()) == [str(i) for i in range(100)]
+    #Ready items are batched rather than sent one at a time
+    assert max(sizes) == 16
+    assert len(sizes) < 20
+
+def test_executor_error_after_partial_chunk():
+    async def broken():
+        yield ' a '
+        yield ' b '
+        raise ValueError('boom')
+
+    async def main():
+        got = []
+        with ThreadPoolExecutor(1) as executor:
+            with pytest.raises(ValueError, match='boom'):
+                async for line in aio.pipeline(broken(), partial(aio.strip_lines, executor=executor), maxsize=8):
+                    got.append(line)
+        return got
+    assert run(main()) == ['a', 'b']
@@ -0,0 +1,139 @@
+from functools import partial
+import time
+
+import pytest
+
+from cookbook import instrument
+from cookbook.data_structures import dedupe, search
+from cookbook.text import combine
+
+LINES = ['a python', 'b', 'a python', 'c python'] * 3
+
+@pytest.fixture
+def registry():
+    instrument.enable()
+    yield instrument.Registry()
+    instrument.disable()
+
+def slow_source(items, delay):
+    for item in items:
+        time.sleep(delay)
+        yield item
+
+def slow_stage(items, delay):
+    for item in items:
+        time.sleep(delay)
+        yield item
+
+def test_disabled_returns_plain_generator():
+    instrument.disable()
+    registry = instrument.Registry()
+    wrapped = instrument.stage(dedupe, held='seen', registry=registry)
+    gen = wrapped(LINES)
+    assert gen.gi_code is dedupe.__code__
+    assert list(gen) == ['a python', 'b', 'c python']
+    assert instrument.map_stage('strip', str.strip, [' a '], registry=registry).__class__ is map
+    assert instrument.filter_stage('f', bool, [1], registry=registry).__class__ is filter
+    items = [1, 2]
+    assert instrument.watch(items, 'w', registry=registry) is items
+    assert registry.snapshot() == {}
+
+def test_counts_and_results(registry):
+    d = instrument.stage(dedupe, held='seen', registry=registry)
+    s = instrument.stage(search, held='previous_lines', registry=registry)
+    out = [line for line, prev in s(d(LINES), 'python', 3)]
+    assert out == ['a python', 'c python']
+    snap = registry.snapshot()
+    assert (snap['dedupe']['items_in'], snap['dedupe']['items_out']) == (12, 3)
+    assert (snap['search']['items_in'], snap['search']['items_out']) == (3, 2)
+    assert snap['dedupe']['item_seconds']['count'] == 3
+    assert snap['dedupe']['wait_seconds']['count'] == 12
+
+def test_held_gauge_includes_final_add(registry):
+    d = instrument.stage(dedupe, held='seen', registry=registry)
+    list(d(LINES))
+    stats = registry.stats('dedupe')
+    assert stats.held_items == 3
+    assert stats.max_held_items == 3
+    assert stats.held_bytes > 0
+
+def test_held_gauge_tracks_bounded_deque(registry):
+    s = instrument.stage(search, held='previous_lines', registry=registry)
+    list(s(['x'] * 10 + ['python'], 'python', 4))
+    assert registry.stats('search').held_items == 4
+
+def test_wait_and_item_time_split(registry):
+    fast = instrument.stage(combine, 'waits', registry=registry)
+    list(fast(slow_source(['ab'] * 5, 0.01), 1))
+    waits = registry.stats('waits')
+    assert waits.wait_seconds.sum >= 0.04
+    assert waits.item_seconds.sum < waits.wait_seconds.sum / 2
+
+    busy = instrument.stage(slow_stage, 'busy', registry=registry)
+    list(busy(range(5), 0.01))
+    stats = registry.stats('busy')
+    assert stats.item_seconds.sum >= 0.04
+    assert stats.wait_seconds.sum < stats.item_seconds.sum / 2
+
+def test_map_filter_and_watch(registry):
+    lines = instrument.map_stage('strip', str.strip, [' a ', ' ', 'b\n'], registry=registry)
+    kept = instrument.filter_stage('nonempty', bool, lines, registry=registry)
+    assert list(instrument.watch(kept, 'watched', registry=registry)) == ['a', 'b']
+    snap = registry.snapshot()
+    assert (snap['strip']['items_in'], snap['strip']['items_out']) == (3, 3)
+    assert (snap['nonempty']['items_in'], snap['nonempty']['items_out']) == (3, 2)
+    assert (snap['watched']['items_in'], snap['watched']['items_out']) == (2, 2)
+
+def test_stage_accepts_non_generator(registry):
+    wrapped = instrument.stage(sorted, registry=registry)
+    assert list(wrapped([3, 1, 2])) == [1, 2, 3]
+    assert registry.stats('sorted').items_out == 3
+
+def test_early_close_closes_stage(registry):
+    closed = []
+    def stage(items):
+        try:
+            yield from items
+        finally:
+            closed.append(True)
+    gen = instrument.stage(stage, registry=registry)(range(10))
+    next(gen)
+    gen.close()
+    assert closed == [True]
+
+def test_histogram_buckets():
+    hist = instrument.Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hist.observe(value)
+    assert hist.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+    assert hist.count == 4
+    assert hist.sum == pytest.approx(2.65)
+
+def test_prometheus_output(registry, tmp_path):
+    d = instrument.stage(dedupe, 'de"dupe', held='seen', registry=registry)
+    list(d(LINES))
+    text = registry.to_prometheus()
+    assert '# TYPE cookbook_stage_items_in_total counter' in text
+    assert 'cookbook_stage_items_in_total{stage="de\\"dupe"} 12' in text
+    assert 'cookbook_stage_items_out_total{stage="de\\"dupe"} 3' in text
+    assert '# TYPE cookbook_stage_item_seconds histogram' in text
+    assert 'cookbook_stage_item_seconds_bucket{stage="de\\"dupe",le="+Inf"} 3' in text
+    assert 'cookbook_stage_wait_seconds_count{stage="de\\"dupe"} 12' in text
+    assert 'cookbook_stage_held_items{stage="de\\"dupe"} 3' in text
+    assert 'cookbook_stage_max_held_items{stage="de\\"dupe"} 3' in text
+    path = tmp_path / 'pipeline.prom'
+    registry.write_prometheus(str(path))
+    assert path.read_text() == text
+
+def test_missing_held_name_warns_once(registry):
+    d = instrument.stage(dedupe, held='sene', registry=registry)
+    with pytest.warns(RuntimeWarning, match="'sene'") as record:
+        assert list(d(LINES)) == ['a python', 'b', 'c python']
+    assert len(record) == 1
+    assert registry.stats('dedupe').held_items == 0
+
+def test_stage_name_defaults_for_partial(registry):
+    wrapped = instrument.stage(partial(search, pattern='python'), registry=registry)
+    assert [line for line, prev in wrapped(LINES)] == ['a python', 'a python', 'c python'] * 3
+    assert len(registry.stages) == 1
+    assert next(iter(registry.stages)).startswith('functools.partial(')
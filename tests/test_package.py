@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import cookbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_import_has_no_eager_submodules():
+    code = ('import sys, cookbook; '
+            'print(sorted(m for m in ("cookbook.data_structures", "cookbook.text", "cookbook.instrument", '
+            '"cookbook.aio", "unicodedata", "asyncio") if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+def test_exports_resolve_and_cache():
+    for name in cookbook.__all__:
+        value = getattr(cookbook, name)
+        assert vars(cookbook)[name] is value
+        assert name in dir(cookbook)
+    with pytest.raises(AttributeError):
+        cookbook.no_such_helper
+
+def test_import_time_budget():
+    spec = importlib.util.spec_from_file_location('import_time', os.path.join(ROOT, 'benchmarks', 'import_time.py'))
+    import_time = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(import_time)
+    #Generous budget: this guards against eager imports, not machine speed
+    assert import_time.main(['--runs', '1', '--budget-ms', '100']) == 0
+
+#1.3
+def test_search_keeps_last_n_lines():
+    lines = ['a', 'b', 'python 1', 'c', 'd', 'e', 'python 2']
+    found = [(line, list(prev)) for line, prev in cookbook.search(lines, 'python', 2)]
+    assert found == [('python 1', ['a', 'b']), ('python 2', ['d', 'e'])]
+
+#1.5
+def test_priority_queue():
+    q = cookbook.PriorityQueue()
+    q.push('foo', 1)
+    q.push('bar', 5)
+    q.push('spam', 4)
+    q.push('grok', 1)
+    assert len(q) == 4
+    assert [q.pop() for _ in range(4)] == ['bar', 'spam', 'foo', 'grok']
+
+#1.10
+def test_dedupe():
+    a = [1, 5, 2, 1, 9, 1, 5, 10]
+    assert list(cookbook.dedupe(a)) == [1, 5, 2, 9, 10]
+    a2 = [{'x': 1, 'y': 2}, {'x': 1, 'y': 3}, {'x': 1, 'y': 2}, {'x': 2, 'y': 4}]
+    assert list(cookbook.dedupe(a2, key=lambda d: (d['x'], d['y']))) == [a2[0], a2[1], a2[3]]
+    assert list(cookbook.dedupe(a2, key=lambda d: d['x'])) == [a2[0], a2[3]]
+
+#2.6
+def test_matchcase():
+    text = 'UPPER PYTHON, lower python, Mixed Python'
+    assert (re.sub('python', cookbook.matchcase('snake'), text, flags=re.IGNORECASE)
+            == 'UPPER SNAKE, lower snake, Mixed Snake')
+
+#2.12
+def test_clean_spaces():
+    assert cookbook.clean_spaces('pýtĥöñ\fis\tawesome\r\n') == 'pýtĥöñ is awesome\n'
+
+def test_unicode_tables():
+    assert cookbook.remove_accents('pýtĥöñ is awesome\n') == 'python is awesome\n'
+    assert '١٢٣'.translate(cookbook.digit_map()) == '123'
+    assert cookbook.digit_map() is cookbook.digit_map()
+    assert cookbook.combining_chars() is cookbook.combining_chars()
+
+#2.14
+def test_combine_yields_each_chunk_once():
+    #The chapter notes yield inside the loop; the book (and the package) yield once per full chunk
+    parts = ['ab'] * 5
+    chunks = list(cookbook.combine(parts, 3))
+    assert chunks == ['abab', 'abab', 'ab']
+    assert ''.join(chunks) == ''.join(parts)
+    assert list(cookbook.combine(['What', 'Is', 'Love', '?'], 32768)) == ['WhatIsLove?']
+    assert list(cookbook.combine([], 10)) == []
+
+#2.15
+def test_safesub():
+    s = '{name} has {n} messages.'
+    assert s.format_map(cookbook.safesub(name='Vader')) == 'Vader has {n} messages.'